@@ -0,0 +1,112 @@
+# Ingredient line parser, kept free of other dependencies so that it can be
+# compiled with mypyc (see README.md)
+import functools
+import string
+from typing import Dict, Final, Tuple
+
+__all__ = ["MEALMASTER_UNITS", "parse_ingredient"]
+
+
+# Mapping to Mealmaster-style units. It is built once at import time and
+# marked Final, which lets mypyc bind it statically; it must not be modified
+# since parsed lines are cached.
+MEALMASTER_UNITS: Final[Dict[str, str]] = {
+    "c": "c",
+    "cup": "c",
+    "cups": "c",
+    "ts": "ts",
+    "teaspoon": "ts",
+    "teaspoons": "ts",
+    "tb": "tb",
+    "tablespoon": "tb",
+    "tablespoons": "tb",
+    "oz": "oz",
+    "ounce": "oz",
+    "ounces": "oz",
+    "lb": "lb",
+    "pound": "lb",
+    "pounds": "lb",
+    "g": "g",
+    "gram": "g",
+    "grams": "g",
+    "kg": "kg",
+    "kilogram": "kg",
+    "kilograms": "kg",
+    "ml": "ml",
+    "milliliter": "ml",
+    "milliliters": "ml",
+    "l": "l",
+    "liter": "l",
+    "liters": "l",
+    "pn": "pn",
+    "pinch": "pn",
+    "ds": "ds",
+    "dash": "ds",
+    "sl": "sl",
+    "slice": "sl"
+}
+
+# Characters of a unit attached to an amount
+_UNIT_CHARS: Final = string.ascii_letters + "."
+
+
+def _is_amount(token: str) -> bool:
+    # Amount token: fraction, decimal, or integer
+    numerator, slash, denominator = token.partition("/")
+    if slash:
+        return numerator.isdecimal() and denominator.isdecimal()
+    whole, point, decimals = token.partition(".")
+    return whole.isdecimal() and (not point or decimals.isdecimal())
+
+
+def _split_amount(token: str) -> Tuple[str, str]:
+    # Amount token, optionally with the unit attached as in "200g" or "12oz."
+    if _is_amount(token):
+        return token, ""
+    amount = token.rstrip(_UNIT_CHARS)
+    unit = MEALMASTER_UNITS.get(token[len(amount):].lower().rstrip("."), "")
+    if unit and _is_amount(amount):
+        return amount, unit
+    return "", ""
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_ingredient_fields(line: str) -> Tuple[str, str, str]:
+    # Recipe books repeat ingredient lines, so the parsed fields are cached as
+    # an immutable tuple
+    amount = ""
+    unit = ""
+    rest = line.strip()
+
+    # Split off the amount, keeping at least one token for the ingredient text
+    parts = rest.split(None, 1)
+    if len(parts) == 2:
+        amount, unit = _split_amount(parts[0])
+        if amount:
+            rest = parts[1]
+            parts = rest.split(None, 1)
+        # Whole number followed by a fraction, e.g. "1 1/2" or "1 1/2cups"
+        if amount.isdigit() and not unit and len(parts) == 2 and "/" in parts[0]:
+            fraction, unit = _split_amount(parts[0])
+            if fraction:
+                amount = f"{amount} {fraction}"
+                rest = parts[1]
+                parts = rest.split(None, 1)
+
+    # Convert unit to Mealmaster-compatible format, accepting abbreviations
+    # with a trailing period such as "oz."
+    if not unit and len(parts) == 2:
+        unit = MEALMASTER_UNITS.get(parts[0].lower().rstrip("."), "")
+        if unit:
+            rest = parts[1]
+
+    return amount, unit, rest
+
+
+def parse_ingredient(line: str) -> Dict[str, str]:
+    amount, unit, ingredient = _parse_ingredient_fields(line)
+    return {
+        "amount": amount,
+        "unit": unit,
+        "ingredient": ingredient,
+    }
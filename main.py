@@ -1,131 +1,144 @@
-from bs4 import BeautifulSoup
-import re
+from lxml import etree
+import hashlib
+import json
 import os
+import sys
+import tempfile
 from fractions import Fraction
+import ingredient_parse
+from ingredient_parse import parse_ingredient
 
 
-def parse_ingredient(line):
-    # Define mapping to Mealmaster-style units
-    mealmaster_units = {
-        "c": "c",
-        "cup": "c",
-        "cups": "c",
-        "ts": "ts",
-        "teaspoon": "ts",
-        "teaspoons": "ts",
-        "tb": "tb",
-        "tablespoon": "tb",
-        "tablespoons": "tb",
-        "oz": "oz",
-        "ounce": "oz",
-        "ounces": "oz",
-        "lb": "lb",
-        "pound": "lb",
-        "pounds": "lb",
-        "g": "g",
-        "gram": "g",
-        "grams": "g",
-        "kg": "kg",
-        "kilogram": "kg",
-        "kilograms": "kg",
-        "ml": "ml",
-        "milliliter": "ml",
-        "milliliters": "ml",
-        "l": "l",
-        "liter": "l",
-        "liters": "l",
-        "pn": "pn",
-        "pinch": "pn",
-        "ds": "ds",
-        "dash": "ds",
-        "sl": "sl",
-        "slice": "sl"
-    }
-    units_pattern = "|".join(mealmaster_units.keys())  # Build unit regex dynamically
-    pattern = rf"""
-        ^\s*                         # Optional leading whitespace
-        (?P<amount>\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)? # Amount: fractions, decimals, or integers
-        \s*                          # Optional whitespace
-        (?P<unit>{units_pattern})?   # Unit (optional)
-        \s*                          # Optional whitespace
-        (?P<ingredient>.+?)          # Ingredient text (everything else)
-        \s*$                         # Optional trailing whitespace
-    """
-    regex = re.compile(pattern, re.IGNORECASE | re.VERBOSE)
-
-    match = regex.match(line)
-    if match:
-        amount = match.group("amount")
-        unit = match.group("unit")
-        ingredient = match.group("ingredient").strip()
-
-        # Convert unit to Mealmaster-compatible format
-        if unit:
-            unit = unit.lower()
-            unit = mealmaster_units.get(unit, unit)  # Map to Mealmaster units
-
-        return {
-            "amount": amount or "",
-            "unit": unit or "",
-            "ingredient": ingredient,
-        }
-    else:
-        # If no match, treat the line as just the ingredient name
-        return {
-            "amount": "",
-            "unit": "",
-            "ingredient": line.strip(),
-        }
+# XPath queries for the recipe fields, compiled once. Classes are matched as
+# one token of the class attribute like BeautifulSoup's class_ filter.
+_RECIPES_XPATH = etree.XPath("//div[contains(concat(' ', normalize-space(@class), ' '), ' recipe-details ')]")
+_TITLE_XPATH = etree.XPath(".//h2[@itemprop='name']")
+_COURSE_XPATH = etree.XPath(".//span[@itemprop='recipeCourse']")
+_CATEGORIES_XPATH = etree.XPath(".//meta[@itemprop='recipeCategory']/@content", smart_strings=False)
+_YIELD_XPATH = etree.XPath(".//span[@itemprop='recipeYield']")
+_INGREDIENTS_XPATH = etree.XPath(
+    ".//div[contains(concat(' ', normalize-space(@class), ' '), ' recipe-ingredients ')]"
+    "[@itemprop='recipeIngredients']//p"
+)
+_DIRECTIONS_XPATH = etree.XPath(".//div[@itemprop='recipeDirections']//p")
 
+_HTML_PARSER = etree.HTMLParser(encoding='utf-8')
 
+# Parsed recipes are cached next to the HTML file. The cache is plain JSON
+# rather than a pickle, so a cache file found in a downloaded or shared
+# folder cannot run code when it is loaded.
+_CACHE_FILE = os.path.join('.cache', 'recipes.json')
 
 
-def parse_recipe(html_file):
-    # Load and parse the HTML file
-    with open(html_file, 'r', encoding='utf-8') as file:
-        soup = BeautifulSoup(file, 'html.parser')
+def _text(element):
+    # Let libxml2 concatenate the element's text in one go and strip it once
+    return etree.tostring(element, method='text', encoding='unicode', with_tail=False).strip()
+
+
+def _first_text(recipe_element, xpath, default):
+    elements = xpath(recipe_element)
+    return _text(elements[0]) if elements else default
+
+
+def _extract_recipe(recipe_element):
+    # Extract recipe title
+    title = _text(_TITLE_XPATH(recipe_element)[0])
+
+    # Extract recipe course
+    course = _first_text(recipe_element, _COURSE_XPATH, "N/A")
+
+    # Extract recipe categories
+    categories = [content for content in _CATEGORIES_XPATH(recipe_element) if content]
 
-    recipes = []
+    # Extract serving size
+    serving_size = _first_text(recipe_element, _YIELD_XPATH, "N/A")
+
+    # Extract ingredients
+    ingredients = [
+        parse_ingredient(text) for text in map(_text, _INGREDIENTS_XPATH(recipe_element)) if text
+    ]
+
+    # Extract directions
+    directions = [
+        text for text in map(_text, _DIRECTIONS_XPATH(recipe_element)) if text
+    ]
+
+    return {
+        'title': title,
+        'course': course,
+        'categories': categories,
+        'serving_size': serving_size,
+        'ingredients': ingredients,
+        'directions': directions
+    }
+
+
+def _parse_html(html_file):
+    # Load and parse the HTML file
+    tree = etree.parse(html_file, _HTML_PARSER)
 
     # Find all recipe-details containers
-    recipe_elements = soup.find_all('div', class_='recipe-details')
-
-    for recipe_element in recipe_elements:
-        # Extract recipe title
-        title = recipe_element.find('h2', itemprop='name').get_text(strip=True)
-
-        # Extract recipe course
-        course = recipe_element.find('span', itemprop='recipeCourse')
-        course = course.get_text(strip=True) if course else "N/A"
-
-        # Extract recipe categories
-        categories_meta = recipe_element.find_all('meta', itemprop='recipeCategory')
-        categories = [meta['content'] for meta in categories_meta if meta['content']]
-
-        # Extract serving size
-        serving_size = recipe_element.find('span', itemprop='recipeYield')
-        serving_size = serving_size.get_text(strip=True) if serving_size else "N/A"
-
-        # Extract ingredients
-        ingredients_div = recipe_element.find('div', class_='recipe-ingredients', itemprop='recipeIngredients')
-        ingredients = [
-            parse_ingredient(p.get_text(strip=True)) for p in ingredients_div.find_all('p') if p.get_text(strip=True)
-        ]
-
-        # Extract directions
-        directions_div = recipe_element.find('div', itemprop='recipeDirections')
-        directions = [
-            p.get_text(strip=True) for p in directions_div.find_all('p') if p.get_text(strip=True)
-        ]
-
-        recipes.append({
-            'title': title,
-            'course': course,
-            'categories': categories,
-            'serving_size': serving_size,
-            'ingredients': ingredients,
-            'directions': directions
-        })
+    return [_extract_recipe(recipe_element) for recipe_element in _RECIPES_XPATH(tree)]
+
+
+def _code_fingerprint():
+    # Hash the parsing code (including a compiled ingredient_parse extension)
+    # so that editing it invalidates cached recipes
+    digest = hashlib.sha256()
+    for path in (__file__, ingredient_parse.__file__):
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def _is_cached_recipe(recipe):
+    # Check that a cached recipe has the structure produced by _extract_recipe
+    return (
+        isinstance(recipe, dict)
+        and all(isinstance(recipe.get(field), str) for field in ('title', 'course', 'serving_size'))
+        and all(
+            isinstance(recipe.get(field), list) and all(isinstance(text, str) for text in recipe[field])
+            for field in ('categories', 'directions')
+        )
+        and isinstance(recipe.get('ingredients'), list)
+        and all(
+            isinstance(ingredient, dict)
+            and all(isinstance(ingredient.get(field), str) for field in ('amount', 'unit', 'ingredient'))
+            for ingredient in recipe['ingredients']
+        )
+    )
+
+
+def parse_recipe(html_file):
+    # Reuse the recipes from the previous run if the HTML file did not change
+    stat = os.stat(html_file)
+    key = [_code_fingerprint(), os.path.abspath(html_file), stat.st_mtime_ns, stat.st_size]
+    cache_file = os.path.join(os.path.dirname(os.path.abspath(html_file)), _CACHE_FILE)
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as file:
+            cache = json.load(file)
+        recipes = cache['recipes']
+        if cache['key'] == key and isinstance(recipes, list) and all(map(_is_cached_recipe, recipes)):
+            return recipes
+    except Exception:
+        pass  # Missing, unreadable or malformed cache, parse the HTML file
+
+    recipes = _parse_html(html_file)
+
+    # Write the cache to a uniquely named temporary file and rename it, so that
+    # neither an interrupted run nor concurrent runs can leave a truncated file
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(cache_file),
+                                         suffix='.tmp', delete=False) as file:
+            json.dump({'key': key, 'recipes': recipes}, file, ensure_ascii=False)
+        try:
+            os.replace(file.name, cache_file)
+        except OSError:
+            os.remove(file.name)
+            raise
+    except OSError:
+        pass  # Caching is optional, e.g. the directory may be read-only
 
     return recipes
 
@@ -153,28 +166,29 @@ def generate_mealmaster(recipe):
     directions = recipe.get("directions", "")
 
     # Header
-    mm_recipe = f"""
+    mm_recipe = [f"""
 MMMMM----------------Meal-Master recipe exported by AnyMeal-----------------
      Title: {title}
 Categories: {", ".join(categories)}
   Servings: {yield_amount or "1"} serving
 
-"""
+"""]
     # Add ingredients
     for ingredient in ingredients:
         amount = ingredient.get("amount", "").rjust(7)  # Align amount
         unit = ingredient.get("unit", "").ljust(2)  # Align unit
         ingredient_text = ingredient.get("ingredient", "")
-        mm_recipe += f"{amount} {unit} {ingredient_text}\n"
+        mm_recipe.append(f"{amount} {unit} {ingredient_text}\n")
 
-    mm_recipe += "\n"
+    mm_recipe.append("\n")
 
     for direction in directions:
-        mm_recipe += f"{direction}\n\n"
+        mm_recipe.append(f"{direction}\n\n")
 
-    mm_recipe += "MMMMM\n"
+    mm_recipe.append("MMMMM\n")
 
-    return mm_recipe.strip()
+    # Join the parts once instead of growing a string in the loops
+    return "".join(mm_recipe).strip()
 
 
 if __name__ == "__main__":
@@ -185,5 +199,6 @@ if __name__ == "__main__":
         print(f"File not found: {input_html}")
     else:
         recipes = parse_recipe(input_html)
-        for recipe in recipes:
-            print(generate_mealmaster(recipe))
+        # Encode all recipes once and write the bytes with a single call
+        output = "".join(f"{generate_mealmaster(recipe)}\n" for recipe in recipes)
+        sys.stdout.buffer.write(output.encode('utf-8'))